@@ -1,11 +1,90 @@
+import math
+
 import streamlit as st
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
+from lorenz_core import cum_with_zero, calc_gini_details
+
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Lorenz Curves and Gini Coefficients", layout="wide")
 
+# --- HELPERS ---
+def _f32(a):
+    """Plot-only float32 copy of `a`; halves what Plotly serializes."""
+    return np.asarray(a, dtype=np.float32)
+
+@st.cache_data
+def initial_shares_df(n_points):
+    """Equal-share starting table for the Tab 2 editor."""
+    init_val = round(1.0/n_points, 2)
+    return pd.DataFrame({
+        "Group": np.arange(1, n_points+1),
+        "Pop. Share": np.full(n_points, init_val),
+        "Income Share": np.full(n_points, init_val)
+    })
+
+# --- CACHED FIGURES ---
+@st.cache_resource
+def build_concept_fig():
+    x_c = _f32(np.linspace(0, 1, 100))
+    y_c = x_c**np.float32(2.5)
+
+    traces = [
+        go.Scatter(x=_f32([0,1]), y=_f32([0,1]), name="Equality", line=dict(color="black", dash="dash")),
+        go.Scatter(x=_f32([0,1,1]), y=_f32([0,0,1]), name="Inequality", line=dict(color="silver", width=1)),
+
+        go.Scatter(x=x_c, y=x_c, showlegend=False, line=dict(color='rgba(0,0,0,0)')),
+        go.Scatter(x=x_c, y=y_c, fill='tonexty', name="Area A", fillcolor='rgba(255, 0, 0, 0.2)', line=dict(color="red")),
+        go.Scatter(x=x_c, y=y_c, fill='tozeroy', name="Area B", fillcolor='rgba(0, 0, 255, 0.1)', line=dict(color="red")),
+    ]
+    layout = go.Layout(
+        annotations=[
+            dict(x=0.5, y=0.35, text="Area A", showarrow=False, font=dict(size=16, color="red")),
+            dict(x=0.7, y=0.15, text="Area B", showarrow=False, font=dict(size=16, color="blue")),
+        ],
+        xaxis_title="Cumulative Pop Proportion", yaxis_title="Cumulative Income Proportion", margin=dict(l=0,r=0,t=0,b=0),
+        uirevision="concept"
+    )
+    return go.Figure(data=traces, layout=layout)
+
+def build_manual_fig(x_coords, y_coords):
+    """Tab 2 Lorenz curve with its trapezoid decomposition."""
+    # Plot-only copies in float32; the Gini math stays in float64
+    plot_x = _f32(x_coords)
+    plot_y = _f32(y_coords)
+
+    # All trapezoids in one trace; NaN breaks the path between polygons
+    x_lo, x_hi = plot_x[:-1], plot_x[1:]
+    y_lo, y_hi = plot_y[:-1], plot_y[1:]
+    n_seg = x_lo.size
+    trap_x = np.empty(5 * n_seg, dtype=np.float32)
+    trap_y = np.empty(5 * n_seg, dtype=np.float32)
+    trap_x[0::5], trap_x[1::5], trap_x[2::5], trap_x[3::5], trap_x[4::5] = x_lo, x_lo, x_hi, x_hi, np.nan
+    trap_y[0::5], trap_y[1::5], trap_y[2::5], trap_y[3::5], trap_y[4::5] = 0, y_lo, y_hi, 0, np.nan
+
+    guide_x = np.repeat(x_hi, 3)
+    guide_x[2::3] = np.nan
+    guide_y = np.empty_like(guide_x)
+    guide_y[0::3], guide_y[1::3], guide_y[2::3] = 0, y_hi, np.nan
+
+    traces = [
+        go.Scatter(x=_f32([0,1]), y=_f32([0,1]), name="Equality", line=dict(color="black", dash="dash")),
+        go.Scatter(x=plot_x, y=plot_y, mode='lines+markers', name="Lorenz Curve", line=dict(color="red")),
+        go.Scatter(
+            x=trap_x, y=trap_y, mode='lines',
+            fill="toself", fillcolor='rgba(255,0,0,0.1)', line=dict(width=0), showlegend=False, hoverinfo='skip'
+        ),
+        go.Scatter(
+            x=guide_x, y=guide_y, mode='lines',
+            line=dict(color="rgba(0,0,0,0.3)", width=1, dash="dot"), showlegend=False, hoverinfo='skip'
+        ),
+    ]
+    # Constant uirevision keeps zoom/pan across edits instead of re-laying out the axes
+    layout = go.Layout(xaxis_title="Cumulative Population Share", yaxis_title="Cumulative Income Share", uirevision="manual")
+    return go.Figure(data=traces, layout=layout)
+
 # --- HEADER ---
 st.title("📊 Lorenz Curves and Gini Coefficients")
 st.subheader("Interactive Economics Laboratory")
@@ -31,26 +110,14 @@ with tabs[0]:
         st.latex(r"Gini = \frac{Area\ A}{Area\ A + Area\ B} = \frac{0.5 - B}{0.5} = 1 - 2B")
     
     with col2:
-        x_c = np.linspace(0, 1, 100)
-        y_c = x_c**2.5 
-        fig_concept = go.Figure()
-        
-        fig_concept.add_trace(go.Scatter(x=[0,1], y=[0,1], name="Equality", line=dict(color="black", dash="dash")))
-        fig_concept.add_trace(go.Scatter(x=[0,1,1], y=[0,0,1], name="Inequality", line=dict(color="silver", width=1)))
-        
-        fig_concept.add_trace(go.Scatter(x=x_c, y=x_c, showlegend=False, line=dict(color='rgba(0,0,0,0)')))
-        fig_concept.add_trace(go.Scatter(x=x_c, y=y_c, fill='tonexty', name="Area A", fillcolor='rgba(255, 0, 0, 0.2)', line=dict(color="red")))
-        fig_concept.add_trace(go.Scatter(x=x_c, y=y_c, fill='tozeroy', name="Area B", fillcolor='rgba(0, 0, 255, 0.1)', line=dict(color="red")))
-        
-        fig_concept.add_annotation(x=0.5, y=0.35, text="Area A", showarrow=False, font=dict(size=16, color="red"))
-        fig_concept.add_annotation(x=0.7, y=0.15, text="Area B", showarrow=False, font=dict(size=16, color="blue"))
-        fig_concept.update_layout(xaxis_title="Cumulative Pop Proportion", yaxis_title="Cumulative Income Proportion", margin=dict(l=0,r=0,t=0,b=0))
-        st.plotly_chart(fig_concept, use_container_width=True)
+        st.plotly_chart(build_concept_fig(), use_container_width=True)
 
 
 
 # --- TAB 2: COMPUTING GINI ---
-with tabs[1]:
+# A fragment, so slider and editor changes rerun only this tab
+@st.fragment
+def computing_gini_tab():
     st.header("Computing Gini Using Variable Trapezoids")
     st.write("Construct your distribution using decimals (e.g., 0.20 for 20%). Both totals must sum to **1.00**.")
     
@@ -59,94 +126,73 @@ with tabs[1]:
     with col_ctrl:
         n_points = st.slider("Number of Population Groups", 2, 20, 5)
         
-        init_val = round(1.0/n_points, 2)
-        df_input = pd.DataFrame({
-            "Group": range(1, n_points+1), 
-            "Pop. Share": [init_val] * n_points,
-            "Income Share": [init_val] * n_points
-        })
-        
         # Input Data Editor
-        edited_df = st.data_editor(df_input, hide_index=True, use_container_width=True)
+        edited_df = st.data_editor(initial_shares_df(n_points), hide_index=True, use_container_width=True)
         
-        pop_shares = edited_df["Pop. Share"].values
-        inc_shares = edited_df["Income Share"].values
-        cum_pop = np.cumsum(pop_shares)
-        cum_inc = np.cumsum(inc_shares)
+        # One 2 x n block so both cumulative sums run in a single call;
+        # cleared cells come back as NaN and count as 0
+        shares = np.nan_to_num(edited_df[["Pop. Share", "Income Share"]].to_numpy(dtype=np.float64, copy=False).T)
+        pop_shares, inc_shares = shares
+        x_coords, y_coords = cum_with_zero(shares)
+        cum_pop, cum_inc = x_coords[1:], y_coords[1:]
+        
+        pop_total = pop_shares.sum()
+        inc_total = inc_shares.sum()
+        pop_ok = math.isclose(pop_total, 1.0, abs_tol=1e-4)
+        inc_ok = math.isclose(inc_total, 1.0, abs_tol=1e-4)
+        is_balanced = pop_ok and inc_ok
         
-        # Tracking Table with Light Gray background for non-editable columns
         display_df = edited_df.copy()
         display_df["Cumulative Pop (xᵢ)"] = cum_pop
         display_df["Cumulative Inc (yᵢ)"] = cum_inc
         
         st.write("### Data Preview & Tracking")
+        # Tracking Table with Light Gray background for non-editable columns
         st.dataframe(
-            display_df.style.set_properties(**{'background-color': '#f0f2f6'}, subset=["Cumulative Pop (xᵢ)", "Cumulative Inc (yᵢ)"]),
+            display_df.style
+                .set_properties(**{'background-color': '#f0f2f6'}, subset=["Cumulative Pop (xᵢ)", "Cumulative Inc (yᵢ)"])
+                .format("{:.3f}", subset=["Cumulative Pop (xᵢ)", "Cumulative Inc (yᵢ)"]),
             hide_index=True
         )
         
-        pop_total = round(pop_shares.sum(), 4)
-        inc_total = round(inc_shares.sum(), 4)
-        
         c1, c2 = st.columns(2)
         with c1:
-            if abs(pop_total - 1.0) < 0.0001: st.success(f"Pop Total: {pop_total} ✅")
-            else: st.error(f"Pop Total: {pop_total} ❌")
+            if pop_ok: st.success(f"Pop Total: {pop_total:.4f} ✅")
+            else: st.error(f"Pop Total: {pop_total:.4f} ❌")
         with c2:
-            if abs(inc_total - 1.0) < 0.0001: st.success(f"Inc Total: {inc_total} ✅")
-            else: st.error(f"Inc Total: {inc_total} ❌")
+            if inc_ok: st.success(f"Inc Total: {inc_total:.4f} ✅")
+            else: st.error(f"Inc Total: {inc_total:.4f} ❌")
 
     with col_res:
-        if abs(pop_total - 1.0) < 0.0001 and abs(inc_total - 1.0) < 0.0001:
-            x_coords = np.insert(cum_pop, 0, 0)
-            y_coords = np.insert(cum_inc, 0, 0)
-            
+        if is_balanced:
             st.write("### 1. Trapezoidal Math Table")
-            calc_rows = []
-            area_b = 0
-            for i in range(len(pop_shares)):
-                base = pop_shares[i]
-                h1, h2 = y_coords[i], y_coords[i+1]
-                avg_h = (h1 + h2) / 2
-                seg_area = base * avg_h
-                area_b += seg_area
-                calc_rows.append([f"{base:.2f}", f"{h1:.3f}", f"{h2:.3f}", f"{avg_h:.3f}", f"{seg_area:.4f}"])
-            
-            # Restored headers connecting Geometry to Economics
-            math_df = pd.DataFrame(calc_rows, columns=[
-                "Base (Pop. Share Δx)", 
-                "Lower Income (yᵢ₋₁)", 
-                "Upper Income (yᵢ)", 
-                "Avg Income (yᵢ+yᵢ₋₁)/2", 
-                "Area (Base × Avg Income)"
-            ])
-            st.table(math_df)
+            gini, area_b, math_df = calc_gini_details(x_coords, y_coords)
+            st.dataframe(math_df.style.format({
+                "Base (Pop. Share Δx)": "{:.2f}",
+                "Lower Income (yᵢ₋₁)": "{:.3f}",
+                "Upper Income (yᵢ)": "{:.3f}",
+                "Avg Income (yᵢ+yᵢ₋₁)/2": "{:.3f}",
+                "Area (Base × Avg Income)": "{:.4f}"
+            }), hide_index=True, use_container_width=True)
             
             st.write("### 2. Result")
             st.latex(r"Area\ B = \sum Area_{segments} = " + f"{area_b:.4f}")
-            gini = (0.5 - area_b) / 0.5
             st.metric("Final Gini Coefficient (1 - 2B)", round(gini, 4))
             
-            fig_man = go.Figure()
-            fig_man.add_trace(go.Scatter(x=[0,1], y=[0,1], name="Equality", line=dict(color="black", dash="dash")))
-            fig_man.add_trace(go.Scatter(x=x_coords, y=y_coords, mode='lines+markers', name="Lorenz Curve", line=dict(color="red")))
-            
-            for i in range(len(pop_shares)):
-                fig_man.add_trace(go.Scatter(
-                    x=[x_coords[i], x_coords[i], x_coords[i+1], x_coords[i+1]],
-                    y=[0, y_coords[i], y_coords[i+1], 0],
-                    fill="toself", fillcolor='rgba(255,0,0,0.1)', line=dict(width=0), showlegend=False
-                ))
-                fig_man.add_shape(type="line", x0=x_coords[i+1], y0=0, x1=x_coords[i+1], y1=y_coords[i+1],
-                                  line=dict(color="rgba(0,0,0,0.3)", width=1, dash="dot"))
-
-            fig_man.update_layout(xaxis_title="Cumulative Population Share", yaxis_title="Cumulative Income Share")
-            st.plotly_chart(fig_man, use_container_width=True)
+            # Reuse the last figure when the coordinates haven't changed
+            fig_key = (x_coords.tobytes(), y_coords.tobytes())
+            if st.session_state.get("manual_fig_key") != fig_key:
+                st.session_state.manual_fig = build_manual_fig(x_coords, y_coords)
+                st.session_state.manual_fig_key = fig_key
+            st.plotly_chart(st.session_state.manual_fig, use_container_width=True)
 
 
 
         else:
             st.info("Balance both Population and Income totals to 1.00 to unlock the Gini calculation.")
 
+with tabs[1]:
+    computing_gini_tab()
+
 st.divider()
 st.caption("Economics Instructional Tool | Version 4.3")